@@ -9,33 +9,43 @@
 #   "python-dateutil",
 #   "docstring-parser",
 #   "httpx",
-#   "scikit-learn",
 #   "pydantic",
+#   "orjson",
 # ]
 # ///
 
+# Heavy libraries used by a single rarely-called tool (bs4, markdown, duckdb,
+# PIL) are imported inside that function to keep worker start-up fast.
 import dotenv
 import logging
 import subprocess
+import shutil
+import threading
 import glob
+import heapq
+import operator
+import mmap
+from collections import OrderedDict
+from contextlib import contextmanager
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
 import sqlite3
 import requests
-from bs4 import BeautifulSoup
-import markdown
+from requests.adapters import HTTPAdapter
 import csv
 import base64
-import duckdb
 import base64
 import numpy as np
 import requests
 import os
 import json
+import orjson
+from datetime import datetime
 from dateutil.parser import parse
 import re
 import docstring_parser
 import httpx
 import inspect
-from sklearn.metrics.pairwise import cosine_similarity
 from typing import Callable, get_type_hints, Dict, Any, Tuple,Optional,List
 from pydantic import create_model, BaseModel
 import re
@@ -48,6 +58,22 @@ RUNNING_IN_CODESPACES = "CODESPACES" in os.environ
 RUNNING_IN_DOCKER = os.path.exists("/.dockerenv")
 logging.basicConfig(level=logging.INFO)
 
+# Shared session so LLM calls reuse pooled keep-alive connections instead of
+# paying a fresh TCP+TLS handshake on every request. Closed on app shutdown.
+HTTP_SESSION = requests.Session()
+HTTP_SESSION.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=100))
+HTTP_SESSION.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=100))
+
+# Upper bound on in-flight LLM requests across all concurrent /run calls. The
+# app's worker pool is sized above this so the semaphore is the binding cap.
+LLM_MAX_CONCURRENCY = 64
+LLM_SLOTS = threading.BoundedSemaphore(LLM_MAX_CONCURRENCY)
+
+def llm_post(url: str, **kwargs) -> requests.Response:
+    """POST to the LLM proxy on the shared session, bounded by LLM_SLOTS."""
+    with LLM_SLOTS:
+        return HTTP_SESSION.post(url, **kwargs)
+
 def ensure_local_path(path: str) -> str:
     """Ensure the path uses './data/...' locally, but '/data/...' in Docker."""
     if ((not RUNNING_IN_CODESPACES) and RUNNING_IN_DOCKER): 
@@ -123,6 +149,34 @@ def convert_function_to_openai_schema(func: Callable) -> dict:
     
     return openai_function_schema
  
+@lru_cache(maxsize=None)
+def resolve_executable(name: str) -> str:
+    """Look up an executable on PATH once per process."""
+    path = shutil.which(name)
+    if path is None:
+        raise FileNotFoundError(f"{name} not found on PATH")
+    return path
+
+# Guards the shared ./node_modules prettier install.
+PRETTIER_LOCK = threading.Lock()
+
+def installed_prettier_package() -> dict:
+    """Return the package.json of the prettier installed in ./node_modules, or {} if none."""
+    try:
+        with open(os.path.join('node_modules', 'prettier', 'package.json'), 'rb') as file:
+            return orjson.loads(file.read())
+    except (OSError, ValueError):
+        return {}
+
+def prettier_cli_path(package: dict) -> str:
+    """Return prettier's CLI script from its package.json bin field (it moved between major versions)."""
+    bin_field = package.get('bin')
+    if isinstance(bin_field, dict):
+        bin_field = bin_field.get('prettier')
+    if not bin_field:
+        raise RuntimeError("Installed prettier package.json has no bin entry")
+    return os.path.normpath(os.path.join(os.getcwd(), 'node_modules', 'prettier', bin_field))
+
 def format_file_with_prettier(file_path: str, prettier_version: str):
     """
     Format the contents of a specified file using Prettier with local installation.
@@ -134,65 +188,99 @@ def format_file_with_prettier(file_path: str, prettier_version: str):
     input_file_path = ensure_local_path(file_path)
     
     try:
-        # Create a local package.json if it doesn't exist
-        if not os.path.exists('package.json'):
-            subprocess.run(["node", "-e", "require('fs').writeFileSync('package.json', JSON.stringify({}))"], check=True)
-        
-        # Install prettier locally in the current directory
-        subprocess.run(
-            ["node", "-e", f"require('child_process').execSync('npm install prettier@{prettier_version} --save-dev')"],
-            check=True,
-            shell=True  # This is needed for Windows
-        )
-        
-        # Use the local prettier installation
-        prettier_path = os.path.join(os.getcwd(), 'node_modules', '.bin', 'prettier')
-        if os.name == 'nt':  # Windows
-            prettier_path += '.cmd'
-        
-        subprocess.run([prettier_path, "--write", input_file_path], check=True)
+        # Concurrent /run requests share ./node_modules: serialize installs, and
+        # keep another request from swapping the version while this one formats
+        with PRETTIER_LOCK:
+            # npm install takes seconds even when nothing changes, so only run it
+            # when the local prettier is missing or a different version
+            package = installed_prettier_package()
+            if package.get('version') != prettier_version:
+                # Create a local package.json if it doesn't exist
+                if not os.path.exists('package.json'):
+                    with open('package.json', 'w') as file:
+                        file.write('{}')
+
+                # Install prettier locally in the current directory
+                subprocess.run(
+                    [resolve_executable("npm"), "install", f"prettier@{prettier_version}", "--save-dev"],
+                    check=True,
+                )
+                package = installed_prettier_package()
+            
+            # Use the local prettier installation, run through node directly so it
+            # does not depend on the .bin shim being executable
+            prettier_path = prettier_cli_path(package)
+            
+            subprocess.run([resolve_executable("node"), prettier_path, "--write", input_file_path], check=True)
         
     except subprocess.CalledProcessError as e:
         raise RuntimeError(f"Error running Prettier: {str(e)}")
     except Exception as e:
         raise RuntimeError(f"Error: {str(e)}. Make sure Node.js is installed.")
         
-def query_gpt(user_input: str,task: str):
-    response = requests.post(
+# Structured-output format for extraction calls: the model must return a JSON
+# object holding only the extracted value, so no prose reaches output files.
+EXTRACTION_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "extraction",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {"answer": {"type": "string"}},
+            "required": ["answer"],
+            "additionalProperties": False,
+        },
+    },
+}
+
+def query_gpt(user_input: str,task: str, response_format: Optional[dict] = None):
+    payload = {
+        "model": "gpt-4o-mini",
+        "messages":[{'role': 'system','content':"JUST SO WHAT IS ASKED\n YOUR output is part of a program, using tool functions"+task},
+                    {'role': 'user', 'content': user_input}]
+    }
+    if response_format:
+        payload["response_format"] = response_format
+    response = llm_post(
         URL_CHAT,
         headers={"Authorization": f"Bearer {API_KEY}",
                 "Content-Type": "application/json"},
-        json={
-            "model": "gpt-4o-mini",
-            "messages":[{'role': 'system','content':"JUST SO WHAT IS ASKED\n YOUR output is part of a program, using tool functions"+task},
-                        {'role': 'user', 'content': user_input}]
-        }
+        data=orjson.dumps(payload)
     )
     logging.info("PRINTING RESPONSE:::"*3)
     print("Inside query_gpt")
     logging.info("PRINTING RESPONSE:::"*3)
     response.raise_for_status()
-    return response.json()
+    return orjson.loads(response.content)
+
+# Sensitive phrases and their indirect rewrites, checked in this order.
+SENSITIVE_REWRITES = {
+    "credit card": "longest numerical sequence",
+    "cvv": "3-digit number near another number",
+    "bank account": "second longest numerical sequence",
+    "routing number": "a series of numbers used for banking",
+    "social security": "9-digit numerical sequence",
+    "passport": "longest alphanumeric string",
+    "driver's license": "structured alphanumeric code",
+    "api key": "a long secret-looking string",
+    "password": "text following 'Password:'",
+}
+_SENSITIVE_PATTERNS = [
+    (re.compile(re.escape(keyword), re.IGNORECASE), replacement)
+    for keyword, replacement in SENSITIVE_REWRITES.items()
+]
+# One case-insensitive pass that rejects tasks without any sensitive phrase.
+_ANY_SENSITIVE = re.compile("|".join(re.escape(keyword) for keyword in SENSITIVE_REWRITES), re.IGNORECASE)
 
 def rewrite_sensitive_task(task: str) -> str:
     """Rewrite sensitive task descriptions in an indirect way."""
-    task_lower = task.lower()
-    
-    rewrite_map = {
-        "credit card": "longest numerical sequence",
-        "cvv": "3-digit number near another number",
-        "bank account": "second longest numerical sequence",
-        "routing number": "a series of numbers used for banking",
-        "social security": "9-digit numerical sequence",
-        "passport": "longest alphanumeric string",
-        "driver's license": "structured alphanumeric code",
-        "api key": "a long secret-looking string",
-        "password": "text following 'Password:'",
-    }
-    
-    for keyword, replacement in rewrite_map.items():
-        if keyword in task_lower:
-            return re.sub(keyword, replacement, task, flags=re.IGNORECASE)
+    if not _ANY_SENSITIVE.search(task):
+        return task
+
+    for pattern, replacement in _SENSITIVE_PATTERNS:
+        if pattern.search(task):
+            return pattern.sub(replacement, task)
 
     return task
 
@@ -201,13 +289,15 @@ def query_gpt_image(image_path: str, task: str):
     logging.info(f"Inside query_gpt_image with image_path: {image_path} and task: {task}")
     image_format = image_path.split(".")[-1]
     clean_task = rewrite_sensitive_task(task)
-    with open(image_path, "rb") as file:
-        base64_image = base64.b64encode(file.read()).decode("utf-8")
-    response = requests.post(
+    # Encode straight from the mapped file, skipping an intermediate bytes copy
+    with map_file(image_path) as image:
+        base64_image = base64.b64encode(image).decode("ascii")
+    response = llm_post(
         URL_CHAT,
         headers={"Authorization": f"Bearer {API_KEY}",
                 "Content-Type": "application/json"},
-        json={
+        # Serialize the body once with orjson rather than requests' stdlib json
+        data=orjson.dumps({
             "model": "gpt-4o-mini",
             "messages": [{'role': 'system','content':"JUST GIVE the required input, as short as possible, one word if possible. "},
                 {
@@ -221,15 +311,89 @@ def query_gpt_image(image_path: str, task: str):
                 ]
                 }
             ]
-            }
+            })
                      )
     
     response.raise_for_status()
-    return response.json()
+    return orjson.loads(response.content)
 
 """"
 A TASKS
 """
+# Most recently used SQLite connections by path, with the file identity
+# (device, inode) they were opened on so a replaced database file gets a fresh
+# connection. In-place changes need no check: SQLite tracks those through its
+# file change counter. Bounded because the path comes from the LLM.
+DB_CONNECTION_CACHE_SIZE = 8
+
+class _DBConnection:
+    __slots__ = ("identity", "conn", "lock", "closed")
+
+    def __init__(self, identity: Tuple[int, int], conn: sqlite3.Connection):
+        self.identity = identity
+        self.conn = conn
+        self.lock = threading.Lock()
+        self.closed = False
+
+    def close(self):
+        # Waits for any query in flight; threads queued on the lock see closed
+        with self.lock:
+            self.conn.close()
+            self.closed = True
+
+_db_connections: "OrderedDict[str, _DBConnection]" = OrderedDict()
+_db_connections_lock = threading.Lock()
+
+def _file_identity(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_dev, stat.st_ino)
+
+def _get_db_entry(key: str) -> _DBConnection:
+    retired = []
+    with _db_connections_lock:
+        entry = _db_connections.get(key)
+        if entry is not None:
+            if entry.identity == _file_identity(key):
+                _db_connections.move_to_end(key)
+                return entry
+            retired.append(_db_connections.pop(key))
+
+        conn = sqlite3.connect(key, check_same_thread=False, isolation_level=None)
+        # Let SQLite read pages through a memory map instead of read() copies
+        conn.execute("PRAGMA mmap_size=268435456")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        entry = _db_connections[key] = _DBConnection(_file_identity(key), conn)
+        while len(_db_connections) > DB_CONNECTION_CACHE_SIZE:
+            retired.append(_db_connections.popitem(last=False)[1])
+    # Close outside the cache lock so a long query does not block lookups
+    for stale in retired:
+        stale.close()
+    return entry
+
+@contextmanager
+def db_connection(db_file_path: str):
+    """Yield a reusable connection to db_file_path, held exclusively for the block."""
+    key = os.path.abspath(db_file_path)
+    while True:
+        entry = _get_db_entry(key)
+        with entry.lock:
+            # Retired while this thread waited for it; fetch a live one
+            if entry.closed:
+                continue
+            yield entry.conn
+            return
+
+def close_db_connections():
+    """Close every cached SQLite connection, e.g. on app shutdown."""
+    with _db_connections_lock:
+        entries = list(_db_connections.values())
+        _db_connections.clear()
+    for entry in entries:
+        entry.close()
+
 def query_database(db_file: str, output_file: str, query: str, query_params: Tuple):
     """
     Executes a SQL query on the specified SQLite database and writes the result to an output file.
@@ -246,13 +410,10 @@ def query_database(db_file: str, output_file: str, query: str, query_params: Tup
     db_file_path = ensure_local_path(db_file)
     output_file_path = ensure_local_path(output_file)
 
-    conn = sqlite3.connect(db_file_path)
-    cursor = conn.cursor()
-
     try:
 
-        cursor.execute(query, query_params)
-        result = cursor.fetchone()
+        with db_connection(db_file_path) as conn:
+            result = conn.execute(query, query_params).fetchone()
 
         if result:
             output_data = result[0]
@@ -264,9 +425,6 @@ def query_database(db_file: str, output_file: str, query: str, query_params: Tup
 
     except sqlite3.Error as e:
         print(f"An error occurred: {e}")
-
-    finally:
-        conn.close()
 def extract_specific_text_using_llm(input_file: str, output_file: str, task: str):
     """
     Extracts specific text from a file using an LLM and writes it to an output file.
@@ -282,18 +440,48 @@ def extract_specific_text_using_llm(input_file: str, output_file: str, task: str
     with open(input_file_path, "r") as file:
         text_info = file.read() #readlines gives list, this gives string
     output_file_path = ensure_local_path(output_file)
-    response = query_gpt(text_info, task) # recieved in json format
+    response = query_gpt(text_info, task, EXTRACTION_RESPONSE_FORMAT) # recieved in json format
     logging.info(f"Inside extract_specific_text_using_llm with input_file: {input_file}, output_file: {output_file}, and task: {task}")
+    content = response["choices"][0]["message"]["content"]
+    try:
+        content = orjson.loads(content)["answer"]
+    except (ValueError, KeyError, TypeError):
+        logging.warning("LLM response did not match the extraction schema, writing it as-is")
     with open(output_file_path, "w") as file:
-        file.write(response["choices"][0]["message"]["content"])
+        file.write(content)
+def decode_embedding(embedding) -> np.ndarray:
+    """Decode a base64 little-endian float32 embedding, or accept a plain list of floats."""
+    if isinstance(embedding, str):
+        return np.frombuffer(base64.b64decode(embedding), dtype="<f4")
+    return np.asarray(embedding, dtype=np.float32)
+
 def get_embeddings(texts: List[str]):
-    response =  requests.post(
+    response = llm_post(
             URL_EMBEDDING,
             headers={"Authorization": f"Bearer {API_KEY}"},
-            json={"model": "text-embedding-3-small", "input": texts},
+            # base64 ships raw float32 bytes instead of ~20 JSON digits per float
+            json={"model": "text-embedding-3-small", "input": texts, "encoding_format": "base64"},
         )
-    embeddings = np.array([emb["embedding"] for emb in response.json()["data"]])
+    embeddings = np.array([decode_embedding(emb["embedding"]) for emb in orjson.loads(response.content)["data"]], dtype=np.float32)
     return embeddings
+# Rows of the similarity matrix computed per matmul, so large inputs never
+# materialize the full n x n matrix.
+SIMILARITY_BLOCK_ROWS = 4096
+
+def most_similar_pair(embeddings: np.ndarray) -> Tuple[int, int]:
+    """Return the indices of the two distinct rows with the highest cosine similarity."""
+    unit = np.asarray(embeddings, dtype=np.float32)
+    unit = unit / np.linalg.norm(unit, axis=1, keepdims=True)
+    best_score, best_pair = -np.inf, (0, 0)
+    for start in range(0, len(unit), SIMILARITY_BLOCK_ROWS):
+        block = unit[start:start + SIMILARITY_BLOCK_ROWS] @ unit.T
+        rows = np.arange(len(block))
+        block[rows, rows + start] = -np.inf  # Ignore self-similarity
+        i, j = np.unravel_index(np.argmax(block), block.shape)
+        if block[i, j] > best_score:
+            best_score, best_pair = block[i, j], (start + int(i), int(j))
+    return best_pair
+
 def get_similar_text_using_embeddings(input_file: str, output_file: str, no_of_similar_texts: int):
     """
     From a given input file, reads each line as a list and finds the most number of similar texts no_of_similar_texts(Eg File containing comments) using embeddings and cosine similarty and writes them to the output file in the order of similarity if specified.
@@ -315,10 +503,7 @@ def get_similar_text_using_embeddings(input_file: str, output_file: str, no_of_s
     documents = [comment.strip() for comment in documents]
     
     line_embeddings = get_embeddings(documents)
-    similarity_matrix = cosine_similarity(line_embeddings)
-    
-    np.fill_diagonal(similarity_matrix, -1)  # Ignore self-similarity
-    most_similar_indices = np.unravel_index(np.argmax(similarity_matrix), similarity_matrix.shape)
+    most_similar_indices = most_similar_pair(line_embeddings)
     
     similar_texts = []
     for i in range(no_of_similar_texts):
@@ -347,6 +532,49 @@ def extract_text_from_image(image_path: str, output_file: str, task: str):
     print(response["choices"][0]["message"])
     with open(output_file_path, "w") as file:
         file.write(response["choices"][0]["message"]["content"].replace(" ", ""))       
+@contextmanager
+def map_file(path: str):
+    """Map a file read-only so it can be scanned without copying it into Python."""
+    with open(path, "rb") as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            yield b""  # mmap cannot map empty files
+            return
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            yield mapped
+
+def find_line_starting_with(content, marker: bytes) -> Optional[bytes]:
+    """Return the first line of content (bytes or mmap) that starts with marker, or None."""
+    if content[:len(marker)] == marker:
+        start = 0
+    else:
+        start = content.find(b"\n" + marker)
+        if start == -1:
+            return None
+        start += 1
+    end = content.find(b"\n", start)
+    return content[start:end if end != -1 else len(content)]
+
+# Bytes read up front when looking for a file's marker line.
+INDEX_HEAD_BYTES = 8192
+
+def read_marker_title(path: str, content_marker: str) -> Optional[str]:
+    """Return the text after content_marker on the first line of path that starts with it."""
+    marker = content_marker.encode("utf-8")
+    # Headers are almost always near the top, so try a single small read first
+    with open(path, "rb") as file:
+        head = file.read(INDEX_HEAD_BYTES)
+    line = find_line_starting_with(head, marker)
+    if len(head) == INDEX_HEAD_BYTES and (line is None or head.endswith(line)):
+        # Not in the head, or the matched line may continue past it
+        with map_file(path) as content:
+            line = find_line_starting_with(content, marker)
+    if line is None:
+        return None
+    return line.decode("utf-8").lstrip(content_marker).strip()
+
+# Threads used to scan files in parallel when building an index.
+INDEX_MAX_WORKERS = 32
+
 def extract_specific_content_and_create_index(input_file: str, output_file: str, extension: str, content_marker: str):
     """
     Identify all files with a specific extension in a directory. For each file, extract particular content (e.g., the first occurrence of a header) and create an index file mapping filenames to their extracted content.
@@ -364,22 +592,43 @@ def extract_specific_content_and_create_index(input_file: str, output_file: str,
     
     index = {}
 
-    for extenstion_file in extenstion_files:
-        title = None
-        with open(extenstion_file, "r", encoding="utf-8") as file:
-            for line in file:
-                if line.startswith(content_marker):
-                    title = line.lstrip(content_marker).strip()
-                    break  
+    # Each file is scanned independently, so overlap the open/read syscalls
+    with ThreadPoolExecutor(max_workers=INDEX_MAX_WORKERS) as executor:
+        titles = list(executor.map(lambda path: read_marker_title(path, content_marker), extenstion_files))
 
+    for extenstion_file, title in zip(extenstion_files, titles):
         relative_path = os.path.relpath(extenstion_file, input_file_path)
         # Replace backslashes with forward slashes
         relative_path = relative_path.replace("\\", "/")
 
         index[relative_path] = title if title else ""
 
-    with open(output_file_path, "w", encoding="utf-8") as json_file:
-        json.dump(index, json_file, indent=2, sort_keys=True)
+    with open(output_file_path, "wb") as json_file:
+        json_file.write(orjson.dumps(index, option=orjson.OPT_INDENT_2 | orjson.OPT_SORT_KEYS))
+# Block size used when reading the first lines of a log file.
+LOG_READ_BYTES = 4096
+
+def read_head_lines(path: str, num_of_lines: int) -> bytes:
+    """Return the first num_of_lines lines of path as raw bytes, reading block by block."""
+    fd = os.open(path, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+    try:
+        chunks, newlines = [], 0
+        while newlines < num_of_lines:
+            chunk = os.read(fd, LOG_READ_BYTES)
+            if not chunk:
+                break
+            chunks.append(chunk)
+            newlines += chunk.count(b"\n")
+    finally:
+        os.close(fd)
+    data = b"".join(chunks)
+    end = -1
+    for _ in range(num_of_lines):
+        end = data.find(b"\n", end + 1)
+        if end == -1:
+            return data
+    return data[:end + 1]
+
 def process_and_write_logfiles(input_file: str, output_file: str, num_logs: int = 10, num_of_lines: int = 1):
     """
     Process n number of log files num_logs given in the input_file and write x number of lines num_of_lines  of each log file to the output_file.
@@ -393,23 +642,19 @@ def process_and_write_logfiles(input_file: str, output_file: str, num_logs: int
     """
     input_file_path = ensure_local_path(input_file)
     output_file_path = ensure_local_path(output_file) 
-    log_files = glob.glob(os.path.join(input_file_path, "*.log"))
-    
-    log_files.sort(key=os.path.getmtime, reverse=True)
-    
+    # scandir entries carry their own stat, so no separate path lookups per file
+    with os.scandir(input_file_path) as entries:
+        log_files = [
+            entry for entry in entries
+            if entry.name.endswith(".log") and not entry.name.startswith(".") and entry.is_file()
+        ]
 
-    recent_logs = log_files[:num_logs]
-    
+    # Only the newest num_logs are needed, so skip sorting the whole directory
+    recent_logs = heapq.nlargest(num_logs, log_files, key=lambda entry: entry.stat().st_mtime)
 
-    with open(output_file_path, "w") as outfile:
+    with open(output_file_path, "wb") as outfile:
         for log_file in recent_logs:
-            with open(log_file, "r") as infile:
-                for _ in range(num_of_lines):
-                    line = infile.readline()
-                    if line:
-                        outfile.write(line)
-                    else:
-                        break
+            outfile.write(read_head_lines(log_file.path, num_of_lines))
 def sort_json_by_keys(input_file: str, output_file: str, keys: list):
     """
     Sort JSON data by specified keys in specified order and write the result to an output file.
@@ -420,13 +665,29 @@ def sort_json_by_keys(input_file: str, output_file: str, keys: list):
     """
     input_file_path = ensure_local_path(input_file)
     output_file_path = ensure_local_path(output_file) 
+    # Stdlib json rather than orjson: orjson reads integers beyond 64 bits as
+    # lossy floats, and this tool is bound by the sort, not by parsing
     with open(input_file_path, "r") as file:
         data = json.load(file)
     
-    sorted_data = sorted(data, key=lambda x: tuple(x[key] for key in keys))
+    # itemgetter builds the key tuple in C instead of a per-item generator
+    sorted_data = sorted(data, key=operator.itemgetter(*keys)) if keys else list(data)
     
     with open(output_file_path, "w") as file:
-        json.dump(sorted_data, file)                       
+        json.dump(sorted_data, file)
+# Formats produced by datagen, tried with strptime before falling back to the
+# much slower format-guessing dateutil parser.
+DATE_FORMATS = ("%Y-%m-%d", "%d-%b-%Y", "%b %d, %Y", "%Y/%m/%d %H:%M:%S")
+
+def parse_date(text: str) -> datetime:
+    """Parse a date with strptime using the fixed datagen formats, falling back to dateutil."""
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, date_format)
+        except ValueError:
+            pass
+    return parse(text)  # Auto-detect format
+
 def count_occurrences(
     input_file: str,
     output_file: str,
@@ -446,6 +707,8 @@ def count_occurrences(
     count = 0
     input_file_path = ensure_local_path(input_file)
     output_file_path = ensure_local_path(output_file)
+    pattern = re.compile(custom_pattern) if custom_pattern else None
+    ordinals, months, years = [], [], []
     with open(input_file_path, "r") as file:
         for line in file:
             line = line.strip()
@@ -453,26 +716,32 @@ def count_occurrences(
                 continue  # Skip empty lines
 
             # Check for custom pattern
-            if custom_pattern and re.search(custom_pattern, line):
+            if pattern and pattern.search(line):
                 count += 1
                 continue
 
             # Attempt to parse the date
             try:
-                parsed_date = parse(line)  # Auto-detect format
+                parsed_date = parse_date(line)
             except (ValueError, OverflowError):
                 print(f"Skipping invalid date format: {line}")
                 continue
 
-            # Check for specific date components
-            if date_component == 'weekday' and parsed_date.weekday() == target_value:
-                count += 1
-            elif date_component == 'month' and parsed_date.month == target_value:
-                count += 1
-            elif date_component == 'year' and parsed_date.year == target_value:
-                count += 1
-            elif date_component == 'leap_year' and parsed_date.year % 4 == 0 and (parsed_date.year % 100 != 0 or parsed_date.year % 400 == 0):
-                count += 1
+            ordinals.append(parsed_date.toordinal())
+            months.append(parsed_date.month)
+            years.append(parsed_date.year)
+
+    # Check for specific date components on whole arrays at once
+    if date_component == 'weekday':
+        # Ordinal 1 (0001-01-01) is a Monday, matching datetime.weekday()
+        count += int(np.count_nonzero((np.array(ordinals, dtype=np.int64) - 1) % 7 == target_value))
+    elif date_component == 'month':
+        count += int(np.count_nonzero(np.array(months, dtype=np.int64) == target_value))
+    elif date_component == 'year':
+        count += int(np.count_nonzero(np.array(years, dtype=np.int64) == target_value))
+    elif date_component == 'leap_year':
+        years = np.array(years, dtype=np.int64)
+        count += int(np.count_nonzero((years % 4 == 0) & ((years % 100 != 0) | (years % 400 == 0))))
 
     # Write the result to the output file
     with open(output_file_path, "w") as file:
@@ -566,6 +835,8 @@ def run_sql_query_on_database(database_file: str, query: str, output_file: str,
         finally:
             conn.close()
     else:
+        import duckdb
+
         try:
             conn = duckdb.connect(database_file)
             cursor = conn.cursor()
@@ -581,12 +852,16 @@ def run_sql_query_on_database(database_file: str, query: str, output_file: str,
 
 #Extract data from (i.e. scrape) a website
 def scrape_webpage(url: str, output_file: str):
+    from bs4 import BeautifulSoup
+
     response = requests.get(url)
     soup = BeautifulSoup(response.text, "html.parser")
     with open(output_file, "w") as file:
         file.write(soup.prettify())
 #Compress or resize an image
 def compress_image(input_file: str, output_file: str, quality: int = 50):
+    from PIL import Image
+
     img = Image.open(input_file)
     img.save(output_file, quality=quality)
 
@@ -597,6 +872,8 @@ def transcribe_audio(input_file: str, output_file: str):
         file.write(transcript)
 #Convert Markdown to HTML
 def convert_markdown_to_html(input_file: str, output_file: str):
+    import markdown
+
     with open(input_file, "r") as file:
         html = markdown.markdown(file.read())
     with open(output_file, "w") as file:
@@ -610,5 +887,5 @@ def filter_csv(input_file: str, column: str, value: str, output_file: str):
         for row in reader:
             if row[column] == value:
                 results.append(row)
-    with open(output_file, "w") as file:
-        json.dump(results, file)
\ No newline at end of file
+    with open(output_file, "wb") as file:
+        file.write(orjson.dumps(results))
\ No newline at end of file
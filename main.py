@@ -13,20 +13,29 @@
 #   "python-dateutil",
 #   "docstring-parser",
 #   "httpx",
-#   "scikit-learn",
 #   "pydantic",
+#   "orjson",
 # ]
 # ///
+import asyncio
+import re
+import threading
 import traceback
-import json
+import orjson
 from dotenv import load_dotenv
-import requests
 from fastapi import FastAPI, HTTPException, Query
-from fastapi.responses import PlainTextResponse, JSONResponse
+from fastapi.responses import FileResponse, PlainTextResponse, ORJSONResponse
 import os
+import stat
 import logging
-from typing import Dict, Callable
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Callable, List, Optional, Tuple
 from function_tasks import (
+    HTTP_SESSION,
+    LLM_MAX_CONCURRENCY,
+    close_db_connections,
+    llm_post,
     format_file_with_prettier,
     convert_function_to_openai_schema,
     query_gpt,
@@ -48,7 +57,16 @@ API_KEY = os.getenv("OPEN_AI_PROXY_TOKEN")
 URL_CHAT = os.getenv("OPEN_AI_PROXY_URL")
 URL_EMBEDDING = os.getenv("OPEN_AI_EMBEDDING_URL")
 
-app = FastAPI()
+app = FastAPI(default_response_class=ORJSONResponse)
+
+# Dedicated pool for blocking LLM and tool work. The default asyncio executor
+# holds at most min(32, cpu + 4) threads, which would cap LLM concurrency below
+# LLM_MAX_CONCURRENCY; the extra threads leave room for long-running tools.
+WORKER_THREADS = LLM_MAX_CONCURRENCY + 32
+WORKER_POOL = ThreadPoolExecutor(max_workers=WORKER_THREADS, thread_name_prefix="task-worker")
+
+async def run_blocking(func: Callable, *args):
+    return await asyncio.get_running_loop().run_in_executor(WORKER_POOL, func, *args)
 
 RUNNING_IN_CODESPACES = "CODESPACES" in os.environ
 RUNNING_IN_DOCKER = os.path.exists("/.dockerenv")
@@ -76,8 +94,42 @@ function_mappings: Dict[str, Callable] = {
     "count_occurrences": count_occurrences,
 }
 
+# Tool schemas are fixed for the life of the process; build them once
+# instead of re-deriving a pydantic model per function on every request.
+TOOLS = [convert_function_to_openai_schema(func) for func in function_mappings.values()]
+
+# LRU cache of classified tasks so repeated task strings skip the LLM round-trip.
+# Keys only collapse whitespace: tasks embed case-sensitive file paths. Entries
+# are added only after their tool calls ran successfully (execute_tool_calls),
+# so a bad classification is retried with the LLM instead of replayed.
+TASK_CACHE_SIZE = 10_000
+_task_cache: "OrderedDict[str, dict]" = OrderedDict()
+_task_cache_lock = threading.Lock()
+
+def _task_cache_key(task_description: str) -> str:
+    return re.sub(r"\s+", " ", task_description.strip())
+
+def _get_cached_task(key: str) -> Optional[dict]:
+    with _task_cache_lock:
+        message = _task_cache.get(key)
+        if message is not None:
+            _task_cache.move_to_end(key)
+        return message
+
+def _cache_task(key: str, message: dict):
+    with _task_cache_lock:
+        _task_cache[key] = message
+        _task_cache.move_to_end(key)
+        if len(_task_cache) > TASK_CACHE_SIZE:
+            _task_cache.popitem(last=False)
+
 def parse_task_description(task_description: str, tools: list):
-    response = requests.post(
+    cache_key = _task_cache_key(task_description)
+    cached_message = _get_cached_task(cache_key)
+    if cached_message is not None:
+        logging.info(f"Task cache hit for: {cache_key}")
+        return cached_message
+    response = llm_post(
         URL_CHAT,
         headers={"Authorization": f"Bearer {API_KEY}",
                 "Content-Type": "application/json"},
@@ -95,16 +147,81 @@ def parse_task_description(task_description: str, tools: list):
             "tool_choice": "required",
         }
     )
+    response.raise_for_status()
     logging.info("PRINTING RESPONSE:::" * 3)
-    print(response.json())
+    # Decode the raw body once with orjson; response.json() would guess the
+    # charset and run the stdlib parser on every access.
+    response_data = orjson.loads(response.content)
+    print(response_data)
     logging.info("PRINTING RESPONSE:::" * 3)
-    return response.json()["choices"][0]["message"]
+    return response_data["choices"][0]["message"]
+
+# Number of tasks marshaled into a single classification prompt by /run-batch.
+TASK_BATCH_SIZE = 16
+
+def parse_task_descriptions(task_descriptions: List[str], tools: list) -> List[Tuple[dict, bool]]:
+    """Classify many tasks with one LLM request per TASK_BATCH_SIZE tasks.
+
+    Tasks already in the classification cache are served from it; only the
+    rest are sent to the LLM. The model is asked for exactly one tool call per
+    numbered task, in order.
+    If a successful response is malformed or has the wrong number of tool
+    calls, that batch falls back to one parse_task_description call per task.
+    HTTP errors (e.g. 429 rate limits) are raised instead, so a throttled
+    batch does not fan out into more requests.
+
+    Tool calls are matched to tasks by position only. If the model gives one
+    task two calls and the next task none, the count still matches and the
+    calls are attributed to the wrong tasks; this is not detected.
+
+    Returns one (message, cacheable) pair per task. Calls split out of a
+    multi-task response are not cacheable, so a misattribution is never
+    replayed; cache hits, single-task fallbacks and batches of one are.
+    """
+    cached = [_get_cached_task(_task_cache_key(task)) for task in task_descriptions]
+    messages = [(message, True) for message in cached]
+    pending = [i for i, message in enumerate(cached) if message is None]
+    for start in range(0, len(pending), TASK_BATCH_SIZE):
+        batch_indices = pending[start:start + TASK_BATCH_SIZE]
+        batch = [task_descriptions[i] for i in batch_indices]
+        numbered_tasks = "\n".join(f"{i}) {task}" for i, task in enumerate(batch, 1))
+        response = llm_post(
+            URL_CHAT,
+            headers={"Authorization": f"Bearer {API_KEY}",
+                    "Content-Type": "application/json"},
+            json={
+                "model": "gpt-4o-mini",
+                "messages": [{
+                    'role': 'system',
+                    'content': "You are intelligent agent that understands and parses tasks. You quickly identify the best tool functions to use to give the desired results"
+                },
+                {
+                    "role": "user",
+                    "content": "Make exactly one tool call per numbered task, in the same order as the tasks:\n" + numbered_tasks
+                }],
+                "tools": tools,
+                "tool_choice": "required",
+            }
+        )
+        response.raise_for_status()
+        try:
+            tool_calls = orjson.loads(response.content)["choices"][0]["message"]["tool_calls"] or []
+        except (ValueError, KeyError, IndexError):
+            tool_calls = []
+        if len(tool_calls) == len(batch):
+            batch_messages = [({"tool_calls": [tool_call]}, len(batch) == 1) for tool_call in tool_calls]
+        else:
+            logging.warning(f"Batch classification returned {len(tool_calls)} tool calls for {len(batch)} tasks, falling back to single calls")
+            batch_messages = [(parse_task_description(task, tools), True) for task in batch]
+        for i, message in zip(batch_indices, batch_messages):
+            messages[i] = message
+    return messages
 
 def execute_function_call(function_call):
     logging.info(f"Inside execute_function_call with function_call: {function_call}")
     try:
         function_name = function_call["name"]
-        function_args = json.loads(function_call["arguments"])
+        function_args = orjson.loads(function_call["arguments"])
         function_to_call = function_mappings.get(function_name)
         
         logging.info("PRINTING RESPONSE:::" * 3)
@@ -124,23 +241,36 @@ def execute_function_call(function_call):
             detail=f"Error executing function: {str(e)}"
         )
 
+@app.on_event("shutdown")
+def close_shared_resources():
+    WORKER_POOL.shutdown(wait=False)
+    HTTP_SESSION.close()
+    close_db_connections()
+
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request, exc):
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=exc.status_code,
         content={"detail": str(exc.detail)}
     )
 
+async def execute_tool_calls(task: str, function_call_response_message: dict, cacheable: bool = True):
+    if function_call_response_message.get("tool_calls"):
+        for tool in function_call_response_message["tool_calls"]:
+            await run_blocking(execute_function_call, tool["function"])
+        # Only a classification whose tool calls all succeeded is worth replaying
+        if cacheable:
+            _cache_task(_task_cache_key(task), function_call_response_message)
+
 @app.post("/run")
 async def run_task(task: str = Query(..., description="Plain-English task description")):
-    tools = [convert_function_to_openai_schema(func) for func in function_mappings.values()]
-    logging.info(len(tools))
+    logging.info(len(TOOLS))
     logging.info(f"Inside run_task with task: {task}")
     try:
-        function_call_response_message = parse_task_description(task, tools)
-        if function_call_response_message["tool_calls"]:
-            for tool in function_call_response_message["tool_calls"]:
-                execute_function_call(tool["function"])
+        # Blocking LLM/tool work runs on worker threads so concurrent /run
+        # requests are not serialized on the event loop.
+        function_call_response_message = await run_blocking(parse_task_description, task, TOOLS)
+        await execute_tool_calls(task, function_call_response_message)
         return {"status": "success", "message": "Task executed successfully"}
     except Exception as e:
         error_details = traceback.format_exc()
@@ -150,16 +280,42 @@ async def run_task(task: str = Query(..., description="Plain-English task descri
             detail=f"Error executing task: {str(e)}"
         )
 
+@app.post("/run-batch")
+async def run_batch(tasks: List[str] = Query(..., description="Plain-English task descriptions, executed in order")):
+    logging.info(f"Inside run_batch with {len(tasks)} tasks")
+    try:
+        messages = await run_blocking(parse_task_descriptions, tasks, TOOLS)
+    except Exception as e:
+        error_details = traceback.format_exc()
+        logging.error(f"Error in run_batch: {error_details}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error parsing tasks: {str(e)}"
+        )
+    results = []
+    for task, (message, cacheable) in zip(tasks, messages):
+        try:
+            await execute_tool_calls(task, message, cacheable)
+            results.append({"task": task, "status": "success"})
+        except HTTPException as e:
+            results.append({"task": task, "status": "error", "detail": str(e.detail)})
+        except Exception as e:
+            logging.error(f"Error in run_batch for task {task!r}: {traceback.format_exc()}")
+            results.append({"task": task, "status": "error", "detail": str(e)})
+    return {"status": "success", "results": results}
+
 @app.get("/read", response_class=PlainTextResponse)
 async def read_file(path: str = Query(..., description="Path to the file to read")):
     logging.info(f"Inside read_file with path: {path}")
     output_file_path = ensure_local_path(path)
-    if not os.path.exists(output_file_path):
-        raise HTTPException(status_code=404, detail="File not found")
+    # Stat once and stream the file as-is instead of decoding it into a str
     try:
-        with open(output_file_path, "r") as file:
-            content = file.read()
-        return content
+        stat_result = os.stat(output_file_path)
+        if not stat.S_ISREG(stat_result.st_mode):
+            raise FileNotFoundError(output_file_path)
+        return FileResponse(output_file_path, media_type="text/plain", stat_result=stat_result)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="File not found")
     except Exception as e:
         logging.error(f"Error reading file: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error reading file: {str(e)}")